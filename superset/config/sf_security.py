@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 from typing import Iterable
 
@@ -11,11 +12,30 @@ TOKEN_PATH = os.getenv("SNOWFLAKE_SERVICE_TOKEN_PATH", "/snowflake/session/token
 ROLE_PREFIX = os.getenv("SF_SYNC_ROLE_PREFIX", "BI_")
 SUPERSET_ROLE_PREFIX = os.getenv("SF_SUPERSET_ROLE_PREFIX", "SF_")
 SYNC_TTL_SECONDS = int(os.getenv("SF_ROLE_SYNC_TTL", "300"))
+_ROLE_PREFIX_LEN = len(ROLE_PREFIX)
+_SUPERSET_ROLE_PREFIX_LEN = len(SUPERSET_ROLE_PREFIX)
+
+
+# (st_mtime_ns, token) of the last read; the token file only changes on rotation.
+_TOKEN_CACHE: tuple[int, str] | None = None
+_TOKEN_LOCK = threading.Lock()
+
+# username -> (expires_at, Snowflake role names); avoids SHOW GRANTS storms between syncs.
+_ROLE_CACHE: dict[str, tuple[float, frozenset[str]]] = {}
+_ROLE_CACHE_LOCK = threading.Lock()
 
 
 def _read_service_token() -> str:
-    with open(TOKEN_PATH, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
+    global _TOKEN_CACHE
+    mtime_ns = os.stat(TOKEN_PATH).st_mtime_ns
+    cached = _TOKEN_CACHE
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with _TOKEN_LOCK:
+        with open(TOKEN_PATH, "r", encoding="utf-8") as handle:
+            token = handle.read().strip()
+        _TOKEN_CACHE = (mtime_ns, token)
+    return token
 
 
 def _snowflake_connect_as_caller():
@@ -38,14 +58,27 @@ def _fetch_roles() -> set[str]:
     try:
         cur = conn.cursor()
         cur.execute("SHOW GRANTS TO USER CURRENT_USER()")
-        role_names: set[str] = set()
-        for row in cur.fetchall():
-            role_names.add(row[1])
-        return role_names
+        # Iterate the cursor directly so rows stream in chunks instead of materializing a list.
+        return {row[1] for row in cur}
     finally:
         conn.close()
 
 
+def _fetch_roles_cached(username: str) -> frozenset[str]:
+    now = time.time()
+    with _ROLE_CACHE_LOCK:
+        cached = _ROLE_CACHE.get(username)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    sf_roles = frozenset(_fetch_roles())
+    with _ROLE_CACHE_LOCK:
+        # Prune on write so users who stop logging in do not accumulate.
+        for expired in [key for key, (expires_at, _) in _ROLE_CACHE.items() if expires_at <= now]:
+            del _ROLE_CACHE[expired]
+        _ROLE_CACHE[username] = (now + SYNC_TTL_SECONDS, sf_roles)
+    return sf_roles
+
+
 class SnowflakeSyncedSecurityManager(SupersetSecurityManager):
     def auth_user_remote_user(self, username):
         user = super().auth_user_remote_user(username)
@@ -56,19 +89,34 @@ class SnowflakeSyncedSecurityManager(SupersetSecurityManager):
         if cached_at and (now - int(cached_at.timestamp())) < SYNC_TTL_SECONDS:
             return user
         try:
-            sf_roles = _fetch_roles()
+            sf_roles = _fetch_roles_cached(username)
         except Exception:
             return user
         desired = {
-            f"{SUPERSET_ROLE_PREFIX}{role}"
+            SUPERSET_ROLE_PREFIX + role
             for role in sf_roles
-            if role.startswith(ROLE_PREFIX)
+            if role[:_ROLE_PREFIX_LEN] == ROLE_PREFIX
+        }
+        current = {
+            role.name
+            for role in user.roles
+            if role.name[:_SUPERSET_ROLE_PREFIX_LEN] == SUPERSET_ROLE_PREFIX
         }
-        current = {role.name for role in user.roles if role.name.startswith(SUPERSET_ROLE_PREFIX)}
-        for role_name in desired - current:
-            role = self.find_role(role_name) or self.add_role(role_name)
-            user.roles.append(role)
-        if current - desired:
-            user.roles = [role for role in user.roles if role.name not in (current - desired)]
+        to_add = desired - current
+        to_remove = current - desired
+        if not to_add and not to_remove:
+            return user
+        if to_add:
+            role_model = self.role_model
+            existing = {
+                role.name: role
+                for role in db.session.query(role_model).filter(role_model.name.in_(to_add)).all()
+            }
+            for role_name in to_add:
+                user.roles.append(existing.get(role_name) or self.add_role(role_name))
+        if to_remove:
+            user.roles = [role for role in user.roles if role.name not in to_remove]
+        # A flush is not enough: FAB has already committed the login stats by now and nothing
+        # commits after this hook, so the session would be rolled back at request teardown.
         db.session.commit()
         return user
@@ -2,20 +2,32 @@ import json
 import os
 from typing import Any, Callable
 
+_RESOLVE_CACHE_MAX = 4096
+_MISSING = object()
+
 
 class SnowflakeRemoteUserMiddleware:
     """Copy Sf-Context-Current-User into REMOTE_USER with optional mapping."""
 
     def __init__(self, app: Callable[[dict[str, Any], Callable], Any]):
         self.app = app
-        self.map = json.loads(os.getenv("SF_SUPERSET_USER_MAP", "{}"))
-        self.default_policy = os.getenv("SF_USER_UNMAPPED_POLICY", "create")
+        # Read config once so the per-request path does no env reads.
+        user_map = json.loads(os.getenv("SF_SUPERSET_USER_MAP", "{}"))
+        self._map = {key.upper(): value for key, value in user_map.items()}
+        policy = os.getenv("SF_USER_UNMAPPED_POLICY", "create")
+        self._policy_deny = policy.lower() == "deny"
+        self._identity = os.getenv("SF_USERNAME_NORMALIZER", "lower") == "identity"
         self.fallback_user = os.getenv("SF_FAKE_REMOTE_USER")
+        # Resolution only depends on the config above; memoize per user.
+        self._cache: dict[str, str | None] = {}
 
     def __call__(self, environ: dict[str, Any], start_response: Callable):
         sf_user = environ.get("HTTP_SF_CONTEXT_CURRENT_USER") or self.fallback_user
         if sf_user:
-            mapped = self._resolve_user(sf_user)
+            # Fast path: a cache hit (even a cached denial) is one dict lookup.
+            mapped = self._cache.get(sf_user, _MISSING)
+            if mapped is _MISSING:
+                mapped = self._resolve_user(sf_user)
             if mapped is None:
                 start_response("403 Forbidden", [("Content-Type", "text/plain")])
                 return [b"Superset access denied: user mapping missing"]
@@ -23,13 +35,17 @@ class SnowflakeRemoteUserMiddleware:
         return self.app(environ, start_response)
 
     def _resolve_user(self, sf_user: str) -> str | None:
-        key = sf_user.upper()
-        if key in self.map:
-            return self.map[key]
-        policy = self.default_policy.lower()
-        if policy == "deny":
+        # Cache fill only; __call__ owns the lookup.
+        mapped = self._resolve_uncached(sf_user)
+        if len(self._cache) >= _RESOLVE_CACHE_MAX:
+            self._cache.clear()
+        self._cache[sf_user] = mapped
+        return mapped
+
+    def _resolve_uncached(self, sf_user: str) -> str | None:
+        mapped = self._map.get(sf_user.upper())
+        if mapped is not None:
+            return mapped
+        if self._policy_deny:
             return None
-        normalize = os.getenv("SF_USERNAME_NORMALIZER", "lower")
-        if normalize == "identity":
-            return sf_user
-        return sf_user.lower()
+        return sf_user if self._identity else sf_user.lower()
@@ -0,0 +1,16 @@
+import functools
+
+
+@functools.lru_cache(maxsize=8)
+def parse_host(raw_host: str) -> tuple[str, str | None]:
+    """Return (normalized host, account inferred from it) for a SNOWFLAKE_HOST value.
+
+    Stdlib-only so superset_config.py can use it without importing the engine spec.
+    """
+    host = raw_host.strip().removeprefix("https://").removeprefix("http://")
+    # Drop any path and port.
+    host = host.split("/", 1)[0].split(":", 1)[0]
+    account = host.removesuffix(".privatelink.snowflakecomputing.com").removesuffix(".snowflakecomputing.com")
+    if account == host:
+        return host, None
+    return host, account or None
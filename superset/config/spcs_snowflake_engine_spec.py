@@ -1,14 +1,18 @@
+import functools
 import logging
 import os
+import threading
 from typing import Any
 
 import snowflake.connector
 from flask import has_request_context, request
 from sqlalchemy import create_engine
-from sqlalchemy.engine.url import make_url
+from sqlalchemy.engine.url import URL, make_url
 from sqlalchemy.pool import NullPool
 from superset.db_engine_specs.snowflake import SnowflakeEngineSpec
 
+from spcs_host import parse_host
+
 _TOKEN_PATH = os.getenv("SNOWFLAKE_SERVICE_TOKEN_PATH", "/snowflake/session/token")
 
 _logger = logging.getLogger(__name__)
@@ -20,13 +24,28 @@ _ACCOUNT_ENV_CANDIDATES = (
     "SNOWFLAKE_ACCOUNT_LOCATOR",
 )
 
+# Auth/target fields owned by the SPCS token flow; never taken from user connect_args.
+_RESERVED_CONNECT_ARGS = frozenset({"account", "host", "authenticator", "token", "user", "username", "password"})
+
+
+# (st_mtime_ns, token) of the last successful read; the token file only changes on rotation.
+_TOKEN_CACHE: tuple[int, str] | None = None
+_TOKEN_LOCK = threading.Lock()
+
 
 def _read_service_token() -> str | None:
+    global _TOKEN_CACHE
     try:
-        with open(_TOKEN_PATH, "r", encoding="utf-8") as handle:
-            token = handle.read().strip()
-        if not token:
-            raise RuntimeError(f"SPCS OAuth token file is empty (path={_TOKEN_PATH})")
+        mtime_ns = os.stat(_TOKEN_PATH).st_mtime_ns
+        cached = _TOKEN_CACHE
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        with _TOKEN_LOCK:
+            with open(_TOKEN_PATH, "r", encoding="utf-8") as handle:
+                token = handle.read().strip()
+            if not token:
+                raise RuntimeError(f"SPCS OAuth token file is empty (path={_TOKEN_PATH})")
+            _TOKEN_CACHE = (mtime_ns, token)
         return token
     except FileNotFoundError:
         return None
@@ -40,11 +59,8 @@ def _read_service_token() -> str | None:
 
 
 def _env_first(keys: tuple[str, ...]) -> str | None:
-    for key in keys:
-        value = os.getenv(key)
-        if value:
-            return value
-    return None
+    environ = os.environ
+    return next((value for key in keys if (value := environ.get(key))), None)
 
 
 def _infer_host(account: str) -> str:
@@ -54,24 +70,10 @@ def _infer_host(account: str) -> str:
     return f"{account}.snowflakecomputing.com"
 
 
-def _normalize_host(host: str) -> str:
-    host = host.strip()
-    if host.startswith("https://"):
-        host = host.removeprefix("https://")
-    if host.startswith("http://"):
-        host = host.removeprefix("http://")
-    # Drop any port.
-    host = host.split("/", 1)[0]
-    host = host.split(":", 1)[0]
-    return host
-
-
-def _infer_account_from_host(host: str) -> str | None:
-    host = _normalize_host(host)
-    for suffix in (".snowflakecomputing.com", ".privatelink.snowflakecomputing.com"):
-        if host.endswith(suffix):
-            return host[: -len(suffix)] or None
-    return None
+@functools.lru_cache(maxsize=64)
+def _parse_uri(uri: str) -> URL:
+    # Superset rebuilds engines for the same URI over and over; URL is immutable so it is safe to share.
+    return make_url(uri)
 
 
 def _split_database_schema(database: str | None) -> tuple[str | None, str | None]:
@@ -97,12 +99,8 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
 
     @classmethod
     def _get_connect_kwargs(cls, uri: str, connect_args: dict[str, Any] | None = None) -> dict[str, Any]:
-        connect_args = dict(connect_args or {})
-        for reserved_key in ("account", "host", "authenticator", "token", "user", "username", "password"):
-            connect_args.pop(reserved_key, None)
-
-        url = make_url(uri)
-        q = dict(url.query)
+        url = _parse_uri(uri)
+        q = url.query
 
         db_from_path, schema_from_path = _split_database_schema(url.database)
         database = db_from_path or q.get("database") or os.getenv("SNOWFLAKE_DATABASE")
@@ -110,7 +108,8 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
         warehouse = q.get("warehouse") or os.getenv("SNOWFLAKE_WAREHOUSE")
         role = q.get("role") or os.getenv("SNOWFLAKE_ROLE")
 
-        account = _env_first(_ACCOUNT_ENV_CANDIDATES) or _infer_account_from_host(os.getenv("SNOWFLAKE_HOST", ""))
+        host, host_account = parse_host(os.getenv("SNOWFLAKE_HOST", ""))
+        account = _env_first(_ACCOUNT_ENV_CANDIDATES) or host_account
         if not account:
             raise RuntimeError(
                 "Missing Snowflake account env var (expected one of: "
@@ -119,7 +118,7 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
             )
 
         # Prefer Snowflake-provided host, but fall back to <account>.snowflakecomputing.com.
-        host = _normalize_host(os.getenv("SNOWFLAKE_HOST", "")) or _infer_host(account)
+        host = host or _infer_host(account)
 
         connect_kwargs: dict[str, Any] = {"host": host, "account": account, "authenticator": "oauth"}
 
@@ -127,7 +126,7 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
         if spcs_auth == "caller":
             if not has_request_context():
                 raise RuntimeError("spcs_auth=caller requires an HTTP request context")
-            if not request.headers.get("Sf-Context-Current-User-Token"):
+            if not request.environ.get("HTTP_SF_CONTEXT_CURRENT_USER_TOKEN"):
                 raise RuntimeError("Missing Sf-Context-Current-User-Token header (execute-as-caller not enabled?)")
 
         if warehouse:
@@ -139,7 +138,10 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
         if schema:
             connect_kwargs["schema"] = schema
 
-        connect_kwargs.update(connect_args)
+        if connect_args:
+            connect_kwargs.update(
+                (key, value) for key, value in connect_args.items() if key not in _RESERVED_CONNECT_ARGS
+            )
         return connect_kwargs
 
     @classmethod
@@ -159,9 +161,7 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
 
         connect_kwargs = cls._get_connect_kwargs(uri, connect_args=connect_args)
 
-        url = make_url(uri)
-        q = dict(url.query)
-        spcs_auth = (q.get("spcs_auth") or os.getenv("SPCS_SNOWFLAKE_AUTH", "service")).lower()
+        spcs_auth = (_parse_uri(uri).query.get("spcs_auth") or os.getenv("SPCS_SNOWFLAKE_AUTH", "service")).lower()
 
         if os.getenv("SPCS_SNOWFLAKE_DEBUG") == "1":
             _logger.info(
@@ -175,25 +175,30 @@ class SPCSSnowflakeEngineSpec(SnowflakeEngineSpec):
                 spcs_auth,
             )
 
+        caller_mode = spcs_auth == "caller"
+
         def creator():
-            # Read token per connection to handle rotation.
+            # Read token per connection to handle rotation (a stat() unless the file changed).
             service_token = _read_service_token()
             if not service_token:
                 raise RuntimeError(f"SPCS OAuth token is not available (path={_TOKEN_PATH})")
 
             token = service_token
-            if spcs_auth == "caller":
-                caller_token = request.headers.get("Sf-Context-Current-User-Token")
+            if caller_mode:
+                # Read the raw WSGI key: a dict hit instead of a case-insensitive header scan.
+                caller_token = request.environ.get("HTTP_SF_CONTEXT_CURRENT_USER_TOKEN")
                 if not caller_token:
                     raise RuntimeError("Missing Sf-Context-Current-User-Token header (execute-as-caller not enabled?)")
                 token = f"{service_token}.{caller_token}"
 
-            return snowflake.connector.connect(**(connect_kwargs | {"token": token}))
+            kw = connect_kwargs.copy()
+            kw["token"] = token
+            return snowflake.connector.connect(**kw)
 
         engine_kwargs: dict[str, Any] = dict(kwargs)
         engine_kwargs.setdefault("pool_pre_ping", True)
         engine_kwargs.setdefault("pool_recycle", int(os.getenv("SPCS_SNOWFLAKE_POOL_RECYCLE", "3300")))
-        if spcs_auth == "caller":
+        if caller_mode:
             engine_kwargs["poolclass"] = NullPool
 
         # Use the Snowflake dialect, but override connection creation with our creator().
@@ -5,6 +5,7 @@ from flask_appbuilder.security.manager import AUTH_REMOTE_USER
 
 from sf_security import SnowflakeSyncedSecurityManager
 from snowflake_remote_user_middleware import SnowflakeRemoteUserMiddleware
+from spcs_host import parse_host
 
 logger = logging.getLogger(__name__)
 
@@ -63,16 +64,7 @@ def _spcs_env_account() -> str | None:
         value = os.getenv(key)
         if value:
             return value
-    host = (os.getenv("SNOWFLAKE_HOST") or "").strip()
-    if host.startswith("https://"):
-        host = host.removeprefix("https://")
-    if host.startswith("http://"):
-        host = host.removeprefix("http://")
-    host = host.split("/", 1)[0].split(":", 1)[0]
-    for suffix in (".snowflakecomputing.com", ".privatelink.snowflakecomputing.com"):
-        if host.endswith(suffix):
-            return host[: -len(suffix)] or None
-    return None
+    return parse_host(os.getenv("SNOWFLAKE_HOST") or "")[1]
 
 
 # As a last line of defense, patch the Snowflake connector to use the SPCS-injected
@@ -84,44 +76,42 @@ try:
     _spcs_orig_connect = _spcs_sf_connector.connect
     _spcs_orig_Connect = getattr(_spcs_sf_connector, "Connect", None)
 
+    # Account/host/auth mode are fixed for the process; only the token (rotation) and the
+    # caller header are resolved per connection.
+    _spcs_account = _spcs_env_account()
+    _spcs_host = None
+    if _spcs_account:
+        _spcs_host = parse_host(os.getenv("SNOWFLAKE_HOST") or "")[0] or f"{_spcs_account}.snowflakecomputing.com"
+    _spcs_caller_mode = os.getenv("SPCS_SNOWFLAKE_AUTH", "service").lower() == "caller"
+
     def _spcs_connect(*args, **kwargs):
+        # Allow explicit oauth/token calls to pass through unchanged (no token file read needed).
+        if kwargs.get("authenticator") == "oauth" and kwargs.get("token"):
+            return _spcs_orig_connect(*args, **kwargs)
+
         token = _spcs_read_service_token()
-        account = _spcs_env_account()
-        host = (os.getenv("SNOWFLAKE_HOST") or "").strip()
 
         # Outside SPCS (or when env/token are missing), keep stock behavior.
-        if not token or not account:
-            return _spcs_orig_connect(*args, **kwargs)
-
-        # Allow explicit oauth/token calls to pass through unchanged.
-        if kwargs.get("authenticator") == "oauth" and kwargs.get("token"):
+        if not token or not _spcs_account:
             return _spcs_orig_connect(*args, **kwargs)
 
         # Optional: caller token (only present when execute-as-caller is enabled).
-        if os.getenv("SPCS_SNOWFLAKE_AUTH", "service").lower() == "caller":
+        if _spcs_caller_mode:
             try:
                 from flask import has_request_context, request
 
                 if has_request_context():
-                    caller = request.headers.get("Sf-Context-Current-User-Token")
+                    caller = request.environ.get("HTTP_SF_CONTEXT_CURRENT_USER_TOKEN")
                     if caller:
                         token = f"{token}.{caller}"
             except Exception:
                 pass
 
-        if host.startswith("https://"):
-            host = host.removeprefix("https://")
-        if host.startswith("http://"):
-            host = host.removeprefix("http://")
-        host = host.split("/", 1)[0].split(":", 1)[0]
-        if not host:
-            host = f"{account}.snowflakecomputing.com"
-
         # Remove unsupported/unsafe auth fields from the upstream call.
         for key in ("user", "username", "password", "account", "host", "authenticator", "token"):
             kwargs.pop(key, None)
 
-        kwargs.update({"host": host, "account": account, "authenticator": "oauth", "token": token})
+        kwargs.update({"host": _spcs_host, "account": _spcs_account, "authenticator": "oauth", "token": token})
         return _spcs_orig_connect(*args, **kwargs)
 
     _spcs_sf_connector.connect = _spcs_connect  # type: ignore[assignment]
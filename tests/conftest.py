@@ -0,0 +1,34 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def import_with_stubs(monkeypatch):
+    """Import a config module fresh, with its heavy imports replaced by stub modules.
+
+    The repo's own ``superset`` package shadows Apache Superset on the test path, so the
+    Superset/Flask/Snowflake/SQLAlchemy names a config module needs are provided here.
+    """
+    imported = []
+
+    def _import(module_path, stubs):
+        for name, attrs in stubs.items():
+            module = types.ModuleType(name)
+            module.__dict__.update(attrs)
+            monkeypatch.setitem(sys.modules, name, module)
+        for name in stubs:
+            parent, _, child = name.rpartition(".")
+            if parent:
+                # Real parents (e.g. the repo's superset package) may not be imported yet.
+                parent_module = sys.modules[parent] if parent in stubs else importlib.import_module(parent)
+                monkeypatch.setattr(parent_module, child, sys.modules[name], raising=False)
+        sys.modules.pop(module_path, None)
+        imported.append(module_path)
+        return importlib.import_module(module_path)
+
+    yield _import
+    for module_path in imported:
+        sys.modules.pop(module_path, None)
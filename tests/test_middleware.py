@@ -1,17 +1,21 @@
-import importlib
-import os
+from superset.config.snowflake_remote_user_middleware import SnowflakeRemoteUserMiddleware
 
-import pytest
 
+MIDDLEWARE_ENV_VARS = (
+    "SF_SUPERSET_USER_MAP",
+    "SF_USER_UNMAPPED_POLICY",
+    "SF_USERNAME_NORMALIZER",
+    "SF_FAKE_REMOTE_USER",
+)
 
-MODULE_PATH = "superset.config.snowflake_remote_user_middleware"
 
-
-def build_middleware(**env_vars):
+def build_middleware(monkeypatch, **env_vars):
+    # The middleware only reads env in __init__, so no module reload is needed.
+    for key in MIDDLEWARE_ENV_VARS:
+        monkeypatch.delenv(key, raising=False)
     for key, value in env_vars.items():
-        os.environ[key] = value
-    module = importlib.reload(importlib.import_module(MODULE_PATH))
-    return module.SnowflakeRemoteUserMiddleware(lambda environ, start: environ)
+        monkeypatch.setenv(key, value)
+    return SnowflakeRemoteUserMiddleware(lambda environ, start: environ)
 
 
 def run_middleware(middleware, environ):
@@ -26,7 +30,7 @@ def run_middleware(middleware, environ):
 
 
 def test_static_mapping_sets_remote_user(monkeypatch):
-    middleware = build_middleware(SF_SUPERSET_USER_MAP='{"TARO":"taro@example.com"}')
+    middleware = build_middleware(monkeypatch, SF_SUPERSET_USER_MAP='{"TARO":"taro@example.com"}')
     environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "TARO"}
     captured, _ = run_middleware(middleware, environ)
     assert environ["REMOTE_USER"] == "taro@example.com"
@@ -34,14 +38,14 @@ def test_static_mapping_sets_remote_user(monkeypatch):
 
 
 def test_default_policy_lowercases(monkeypatch):
-    middleware = build_middleware(SF_SUPERSET_USER_MAP="{}", SF_USER_UNMAPPED_POLICY="create")
+    middleware = build_middleware(monkeypatch, SF_SUPERSET_USER_MAP="{}", SF_USER_UNMAPPED_POLICY="create")
     environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "ALICE"}
     run_middleware(middleware, environ)
     assert environ["REMOTE_USER"] == "alice"
 
 
 def test_policy_deny_blocks_request(monkeypatch):
-    middleware = build_middleware(SF_SUPERSET_USER_MAP="{}", SF_USER_UNMAPPED_POLICY="deny")
+    middleware = build_middleware(monkeypatch, SF_SUPERSET_USER_MAP="{}", SF_USER_UNMAPPED_POLICY="deny")
     environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "UNKNOWN"}
     captured, body = run_middleware(middleware, environ)
     assert captured["status"].startswith("403")
@@ -50,7 +54,35 @@ def test_policy_deny_blocks_request(monkeypatch):
 
 
 def test_fallback_user_used_when_header_missing(monkeypatch):
-    middleware = build_middleware(SF_FAKE_REMOTE_USER="localuser")
+    middleware = build_middleware(monkeypatch, SF_FAKE_REMOTE_USER="localuser")
     environ = {}
     run_middleware(middleware, environ)
     assert environ["REMOTE_USER"] == "localuser"
+
+
+def test_mapping_keys_are_case_insensitive(monkeypatch):
+    middleware = build_middleware(monkeypatch, SF_SUPERSET_USER_MAP='{"hanako":"hanako@example.com"}')
+    environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "Hanako"}
+    run_middleware(middleware, environ)
+    assert environ["REMOTE_USER"] == "hanako@example.com"
+
+
+def test_identity_normalizer_keeps_case(monkeypatch):
+    middleware = build_middleware(
+        monkeypatch,
+        SF_SUPERSET_USER_MAP="{}",
+        SF_USER_UNMAPPED_POLICY="create",
+        SF_USERNAME_NORMALIZER="identity",
+    )
+    environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "Bob"}
+    run_middleware(middleware, environ)
+    assert environ["REMOTE_USER"] == "Bob"
+
+
+def test_cached_denial_still_blocks(monkeypatch):
+    middleware = build_middleware(monkeypatch, SF_SUPERSET_USER_MAP="{}", SF_USER_UNMAPPED_POLICY="deny")
+    for _ in range(2):
+        environ = {"HTTP_SF_CONTEXT_CURRENT_USER": "UNKNOWN"}
+        captured, _ = run_middleware(middleware, environ)
+        assert captured["status"].startswith("403")
+        assert "REMOTE_USER" not in environ
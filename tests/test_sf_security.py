@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+MODULE_PATH = "superset.config.sf_security"
+
+
+class FakeRole:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeNameColumn:
+    def in_(self, names):
+        return set(names)
+
+
+class FakeRoleModel:
+    name = FakeNameColumn()
+
+
+class FakeQuery:
+    def __init__(self, session):
+        self.session = session
+        self.names = set()
+
+    def filter(self, names):
+        self.names = names
+        return self
+
+    def all(self):
+        return [FakeRole(name) for name in sorted(self.names) if name in self.session.existing]
+
+
+class FakeSession:
+    def __init__(self):
+        self.existing = set()
+        self.queries = 0
+        self.commits = 0
+
+    def query(self, model):
+        self.queries += 1
+        return FakeQuery(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeSupersetSecurityManager:
+    user = None
+
+    def auth_user_remote_user(self, username):
+        return self.user
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def sf_security(import_with_stubs, session):
+    return import_with_stubs(
+        MODULE_PATH,
+        {
+            "snowflake": {},
+            "snowflake.connector": {"connect": None},
+            "flask": {"has_request_context": lambda: False, "request": None},
+            "superset.extensions": {"db": SimpleNamespace(session=session)},
+            "superset.security": {"SupersetSecurityManager": FakeSupersetSecurityManager},
+        },
+    )
+
+
+def build_manager(sf_security, role_names):
+    manager = sf_security.SnowflakeSyncedSecurityManager()
+    manager.user = SimpleNamespace(last_login=None, roles=[FakeRole(name) for name in role_names])
+    manager.role_model = FakeRoleModel
+    manager.added_roles = []
+
+    def add_role(name):
+        manager.added_roles.append(name)
+        return FakeRole(name)
+
+    manager.add_role = add_role
+    return manager
+
+
+def stub_fetch_roles(monkeypatch, sf_security, sf_roles):
+    calls = []
+
+    def fetch_roles():
+        calls.append(1)
+        return set(sf_roles)
+
+    monkeypatch.setattr(sf_security, "_fetch_roles", fetch_roles)
+    return calls
+
+
+def role_names(user):
+    return sorted(role.name for role in user.roles)
+
+
+def test_unchanged_roles_skip_commit(monkeypatch, sf_security, session):
+    stub_fetch_roles(monkeypatch, sf_security, {"BI_SALES", "PUBLIC"})
+    manager = build_manager(sf_security, ["Gamma", "SF_BI_SALES"])
+    user = manager.auth_user_remote_user("taro")
+    assert role_names(user) == ["Gamma", "SF_BI_SALES"]
+    assert session.queries == 0
+    assert session.commits == 0
+
+
+def test_new_roles_are_looked_up_in_one_query(monkeypatch, sf_security, session):
+    stub_fetch_roles(monkeypatch, sf_security, {"BI_A", "BI_B", "BI_C", "PUBLIC"})
+    session.existing = {"SF_BI_A"}
+    manager = build_manager(sf_security, ["Gamma"])
+    user = manager.auth_user_remote_user("taro")
+    assert role_names(user) == ["Gamma", "SF_BI_A", "SF_BI_B", "SF_BI_C"]
+    assert sorted(manager.added_roles) == ["SF_BI_B", "SF_BI_C"]
+    assert session.queries == 1
+    assert session.commits == 1
+
+
+def test_revoked_roles_are_removed(monkeypatch, sf_security, session):
+    stub_fetch_roles(monkeypatch, sf_security, set())
+    manager = build_manager(sf_security, ["Gamma", "SF_BI_OLD"])
+    user = manager.auth_user_remote_user("taro")
+    assert role_names(user) == ["Gamma"]
+    assert session.queries == 0
+    assert session.commits == 1
+
+
+def test_roles_are_cached_for_ttl(monkeypatch, sf_security):
+    calls = stub_fetch_roles(monkeypatch, sf_security, {"BI_SALES"})
+    now = [1000.0]
+    monkeypatch.setattr(sf_security.time, "time", lambda: now[0])
+
+    build_manager(sf_security, ["Gamma"]).auth_user_remote_user("taro")
+    now[0] += sf_security.SYNC_TTL_SECONDS - 1
+    user = build_manager(sf_security, ["Gamma"]).auth_user_remote_user("taro")
+    assert len(calls) == 1
+    assert role_names(user) == ["Gamma", "SF_BI_SALES"]
+
+    now[0] += 1
+    build_manager(sf_security, ["Gamma"]).auth_user_remote_user("taro")
+    assert len(calls) == 2
+
+
+def test_expired_role_cache_entries_are_pruned(monkeypatch, sf_security):
+    stub_fetch_roles(monkeypatch, sf_security, {"BI_SALES"})
+    now = [1000.0]
+    monkeypatch.setattr(sf_security.time, "time", lambda: now[0])
+
+    build_manager(sf_security, ["Gamma"]).auth_user_remote_user("taro")
+    now[0] += sf_security.SYNC_TTL_SECONDS
+    build_manager(sf_security, ["Gamma"]).auth_user_remote_user("hanako")
+    assert set(sf_security._ROLE_CACHE) == {"hanako"}
@@ -0,0 +1,17 @@
+import pytest
+
+from spcs_host import parse_host
+
+
+@pytest.mark.parametrize(
+    ("raw_host", "expected"),
+    [
+        ("org.privatelink.snowflakecomputing.com", ("org.privatelink.snowflakecomputing.com", "org")),
+        ("org-acct.snowflakecomputing.com", ("org-acct.snowflakecomputing.com", "org-acct")),
+        (" https://org-acct.snowflakecomputing.com:443/path ", ("org-acct.snowflakecomputing.com", "org-acct")),
+        ("", ("", None)),
+        (".snowflakecomputing.com", (".snowflakecomputing.com", None)),
+    ],
+)
+def test_parse_host(raw_host, expected):
+    assert parse_host(raw_host) == expected
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+
+MODULE_PATH = "superset.config.spcs_snowflake_engine_spec"
+
+
+class FakeSnowflakeEngineSpec:
+    pass
+
+
+@pytest.fixture
+def token_path(tmp_path):
+    return tmp_path / "token"
+
+
+@pytest.fixture
+def engine_spec(import_with_stubs, monkeypatch, token_path):
+    monkeypatch.setenv("SNOWFLAKE_SERVICE_TOKEN_PATH", str(token_path))
+    return import_with_stubs(
+        MODULE_PATH,
+        {
+            "snowflake": {},
+            "snowflake.connector": {"connect": None},
+            "flask": {"has_request_context": lambda: False, "request": None},
+            "sqlalchemy": {"create_engine": None},
+            "sqlalchemy.engine": {},
+            "sqlalchemy.engine.url": {"URL": object, "make_url": None},
+            "sqlalchemy.pool": {"NullPool": object},
+            "superset.db_engine_specs": {},
+            "superset.db_engine_specs.snowflake": {"SnowflakeEngineSpec": FakeSnowflakeEngineSpec},
+        },
+    )
+
+
+def write_token(path, token, mtime_ns):
+    path.write_text(f"{token}\n", encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_read_service_token_picks_up_rotation(engine_spec, token_path):
+    write_token(token_path, "first", 1_000_000_000)
+    assert engine_spec._read_service_token() == "first"
+    assert engine_spec._TOKEN_CACHE == (1_000_000_000, "first")
+
+    write_token(token_path, "second", 2_000_000_000)
+    assert engine_spec._read_service_token() == "second"
+
+
+def test_read_service_token_returns_none_when_file_is_removed(engine_spec, token_path):
+    write_token(token_path, "first", 1_000_000_000)
+    assert engine_spec._read_service_token() == "first"
+
+    token_path.unlink()
+    assert engine_spec._read_service_token() is None
+